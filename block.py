@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+
 from pathlib import Path
 
 from datetime import datetime
 from typing import Any, List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from google.protobuf.timestamp_pb2 import Timestamp
 
@@ -115,6 +117,30 @@ class Block(BaseModel):
     block_hash: str
     size: int
 
+    _header_hash: Optional[str] = PrivateAttr(default=None)
+    _hex: Optional[str] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in self.__fields__:
+            self._hex = None
+        if name == "header":
+            self._header_hash = None
+        super().__setattr__(name, value)
+
+    def hash(self) -> str:
+        """
+        SHA256 hash of the block header. It is only computed the first time it is needed,
+        so the header must not be changed in place once it belongs to a block.
+
+        Unlike block_hash, this is always computed locally, so it can be trusted for
+        blocks received from other nodes.
+        """
+        if self._header_hash is None:
+            self._header_hash = hashlib.sha256(
+                self.header.SerializeToString()
+            ).hexdigest()
+        return self._header_hash
+
     def SerializeToString(self) -> bytes:
         timestamp = Timestamp()
         timestamp.FromDatetime(self.header.timestamp)
@@ -138,7 +164,13 @@ class Block(BaseModel):
         return block.SerializeToString()
 
     def SerializeToHex(self) -> str:
-        return self.SerializeToString().hex()
+        """
+        The block is only serialized once, since it is saved and broadcasted many times.
+        Like hash(), this relies on the header not being changed in place.
+        """
+        if self._hex is None:
+            self._hex = self.SerializeToString().hex()
+        return self._hex
 
     @staticmethod
     def ParseFromString(block_bytes: bytes) -> Block:
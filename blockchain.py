@@ -1,18 +1,20 @@
 """
 The blockchain (Really need to add a better description of what this is)
 """
-from functools import reduce
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from datetime import datetime
 
 from urllib.parse import urlparse
 from uuid import UUID
 
-from typing import List, Optional, Set, Tuple
+from typing import Any, DefaultDict, Dict, FrozenSet, List, Optional, Set, Tuple
 
 import tempfile
 import shutil
 import logging
+import threading
 import requests
 
 from block import Block, Header
@@ -24,6 +26,12 @@ logger = logging.getLogger(__name__)
 
 MINING_REWARD = 10
 
+# Seconds to wait on a node before giving up on a broadcast or chain head request
+NODE_TIMEOUT = 2
+
+# Broadcasts and chain head requests are sent to every node at the same time from this pool
+_node_executor = ThreadPoolExecutor(max_workers=32)
+
 
 class Blockchain:  # pylint: disable=too-many-instance-attributes
     """
@@ -34,10 +42,16 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
           The list of blocks
       __open_transactions (private): <List[FinalTransaction]>
           The list of transactions that have not yet been committed in a block to the blockchain
+      __balances (private): <DefaultDict[str, float]>
+          The balance of every participant of the stored transactions
+      __indexed_transactions (private): <Set[str]>
+          The hashes of the transactions already counted in __balances
       difficulty : <int> optional
           The difficulty for mining
       address : <str>
           Wallet address that transfers initiated from this node will be used as the recipient
+      nodes : <FrozenSet[str]>
+          The other nodes on the network this node is aware of
     """
 
     def __init__(
@@ -53,7 +67,12 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         # Generate a globally unique UUID for this node
         self.chain_identifier = node_id
         self.__open_transactions = []  # type: List[FinalTransaction]
-        self.nodes = set()  # type: Set[str]
+        self.__balances = defaultdict(float)  # type: DefaultDict[str, float]
+        self.__indexed_transactions = set()  # type: Set[str]
+        # Replaced, never changed in place, so it can be read without holding the lock
+        self.nodes = frozenset()  # type: FrozenSet[str]
+        self.__nodes_lock = threading.Lock()
+        self.__session = requests.Session()
         self.difficulty = difficulty
         self.address = address
         self.version = version
@@ -99,7 +118,8 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         and a setter (@chain.setter)
 
         chain[:] returns a copy so we only get a copy of the reference of the objects,
-        so we can't directly change the value
+        so we can't directly change the value. Code in this class uses __chain directly
+        instead, so it doesn't pay for the copy.
         """
         return self.__chain[:]
 
@@ -152,7 +172,7 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         :return: <str>
         """
 
-        return [b.block_hash for b in self.chain]
+        return [b.block_hash for b in self.__chain]
 
     def save_data(self) -> None:
         try:
@@ -161,7 +181,7 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
                     self.data_location, transaction, "open"
                 )
 
-            for block in self.chain:
+            for block in self.__chain:
                 Block.SaveBlock(self.data_location, block)
         except Exception as e:
             logger.exception(e)
@@ -178,9 +198,64 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
                 chain.sort(key=lambda x: x.index, reverse=False)
 
                 self.chain = chain
+
+            self.__rebuild_balances()
         except Exception as e:
             logger.exception(e)
 
+    def __index_transaction(self, transaction: FinalTransaction) -> None:
+        """
+        Add the transaction to the balances of its sender and recipient, unless it was
+        already counted (e.g. when it moves from open to confirmed)
+        """
+        if transaction.transaction_hash in self.__indexed_transactions:
+            return
+        self.__indexed_transactions.add(transaction.transaction_hash)
+
+        details = transaction.signed_transaction.details
+        self.__balances[details.sender] -= details.amount
+        self.__balances[details.recipient] += details.amount
+
+    def __rebuild_balances(self) -> None:
+        """
+        Rebuild the balances from every transaction in the node's storage
+        """
+        self.__balances = defaultdict(float)
+        self.__indexed_transactions = set()
+        for transaction in FinalTransaction.LoadAllTransactions(self.data_location):
+            self.__index_transaction(transaction)
+
+    def save_transaction(self, transaction: FinalTransaction, type_: str) -> None:
+        """
+        Save a transaction received from the network and count it in the balances
+        """
+        FinalTransaction.SaveTransaction(self.data_location, transaction, type_)
+        self.__index_transaction(transaction)
+
+    def __post_to_nodes(
+        self, path: str, payload: Dict[str, Any], declined_message: str
+    ) -> None:
+        """
+        Post the payload to <path> on every node this node is aware of, all at once.
+
+        The connections to the nodes are kept alive between broadcasts. Nodes that can't
+        be reached are skipped without holding up the others.
+        """
+
+        def post(node: str) -> None:
+            url = f"{node}/{path}"
+            try:
+                response = self.__session.post(url, json=payload, timeout=NODE_TIMEOUT)
+                if response.status_code == 400 or response.status_code == 500:
+                    logger.error(declined_message, response.json())
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                logger.debug("Unable to reach %s", url)
+
+        # Wait for every node to answer before moving on
+        nodes = self.nodes
+        for _ in _node_executor.map(post, nodes):
+            pass
+
     def __broadcast_transaction(
         self, transaction: SignedRawTransaction, type_: str
     ) -> None:
@@ -190,20 +265,12 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
 
         This ensures synchronicity across all nodes on the network.
         """
-        for node in self.nodes:
-            url = f"{node}/broadcast-transaction"
-            try:
-                logging.debug("Broadcasting new transaction %s to %s", transaction, url)
-                response = requests.post(
-                    url,
-                    json={"transaction": transaction.SerializeToHex(), "type": type_},
-                )
-                if response.status_code == 400 or response.status_code == 500:
-                    logger.error(
-                        "Transaction declined, needs resolving: %s", response.json()
-                    )
-            except requests.exceptions.ConnectionError:
-                continue
+        logger.debug("Broadcasting new transaction %s to %s", transaction, self.nodes)
+        self.__post_to_nodes(
+            "broadcast-transaction",
+            {"transaction": transaction.SerializeToHex(), "type": type_},
+            "Transaction declined, needs resolving: %s",
+        )
 
     def __broadcast_block(self, block: Block) -> None:
         """
@@ -214,16 +281,12 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
 
         This ensures synchronicity across all nodes on the network.
         """
-        logger.debug("Broadcasting blocks to following nodes: %s", self.nodes)
-        for node in self.nodes:
-            url = f"{node}/broadcast-block"
-            logger.debug("Broadcasting new block %s to %s", block, url)
-            try:
-                response = requests.post(url, json={"block": block.SerializeToHex()})
-                if response.status_code == 400 or response.status_code == 500:
-                    logger.error("Block declined, needs resolving: %s", response.json())
-            except requests.exceptions.ConnectionError:
-                continue
+        logger.debug("Broadcasting new block %s to %s", block, self.nodes)
+        self.__post_to_nodes(
+            "broadcast-block",
+            {"block": block.SerializeToHex()},
+            "Block declined, needs resolving: %s",
+        )
 
     def get_last_tx_nonce(
         self, tx: SignedRawTransaction, type_: str, exclude: bool
@@ -235,21 +298,16 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         all_transactions = FinalTransaction.LoadTransactions(self.data_location, type_)
         participant = tx.details.sender
 
-        txns = [
-            t.signed_transaction
-            for t in all_transactions
-            if t.signed_transaction.details.sender == participant
-        ]
-        txns.sort(key=lambda t: t.details.nonce, reverse=False)
-
         # When getting the correct nonce, exclude the current transacation when this is done via
         # mining, since these have already been verified, so the nonce of tx will always be in
-        # txns
-        if exclude:
-            txns = list(filter(lambda t: t != tx, txns))
-
-        nonces = [t.details.nonce for t in txns]
-        return nonces[0] if nonces else None
+        # the stored transactions
+        nonces = (
+            t.signed_transaction.details.nonce
+            for t in all_transactions
+            if t.signed_transaction.details.sender == participant
+            and not (exclude and t.signed_transaction == tx)
+        )
+        return min(nonces, default=None)
 
     # Calculate and return the balance of the user
     def get_balance(self, sender: str = None) -> Optional[float]:
@@ -264,61 +322,12 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         else:
             participant = sender
 
-        all_transactions = FinalTransaction.LoadAllTransactions(self.data_location)
-
-        # Fetch a list of all sent coin amounts for the given person
-        # (empty lists are returned if the person was NOT the sender)
-
-        # This fetches sent amounts of transactions that were already included in
-        # blocks of the blockchain
-        tx_sender = [
-            [
-                tx.signed_transaction.details.amount
-                for tx in all_transactions
-                if tx.signed_transaction.details.sender == participant
-            ]
-        ]
-
-        logger.debug("Sender's sent transactions on the chain: %s", tx_sender)
-
-        amount_sent = reduce(
-            lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-            if len(tx_amt) > 0.0
-            else tx_sum + 0.0,
-            tx_sender,
-            0.0,
-        )
-
-        logger.debug("Sender's total coin sent: %s", amount_sent)
-
-        # This fetches received coin amounts of transactions that were already included
-        # in blocks of the blockchain
-        #
-        # We ignore open transactions here because you shouldn't be able to spend coins
-        # before the transaction was confirmed + included in a block
-        tx_recipient = [
-            [
-                tx.signed_transaction.details.amount
-                for tx in all_transactions
-                if tx.signed_transaction.details.recipient == participant
-            ]
-        ]
+        # The balances count every transaction this node stored, including the open
+        # ones, and are kept up to date whenever a transaction is saved
+        balance = self.__balances.get(participant, 0.0)
+        logger.debug("Sender's balance: %s", balance)
 
-        logger.debug("Sender's received transactions on the chain: %s", tx_recipient)
-
-        amount_received = reduce(
-            lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-            if len(tx_amt) > 0.0
-            else tx_sum + 0.0,
-            tx_recipient,
-            0.0,
-        )
-
-        logger.debug("Sender's total coin received: %s", amount_received)
-        logger.debug("Sender's balance: %s", (amount_received - amount_sent))
-
-        # Return the total balance
-        return amount_received - amount_sent
+        return balance
 
     def add_transaction(
         self, transaction: SignedRawTransaction, is_receiving: bool = False
@@ -344,6 +353,7 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
             )
 
             self.__open_transactions.append(final_tx)
+            self.__index_transaction(final_tx)
             self.save_data()
 
             if not is_receiving:
@@ -392,7 +402,7 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         transaction_merkle_root = get_merkle_root(
             [tx.signed_transaction for tx in self.get_open_transactions]
         )
-        previous_hash = Verification.hash_block_header(last_block.header)
+        previous_hash = last_block.hash()
 
         block_header = Header(
             version=version,
@@ -436,9 +446,7 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
             ):
                 return None
 
-        FinalTransaction.SaveTransaction(
-            self.data_location, reward_transaction, "mining"
-        )
+        self.save_transaction(reward_transaction, "mining")
         self.__broadcast_transaction(reward_transaction.signed_transaction, "mining")
 
         for t in copied_open_transactions:
@@ -481,25 +489,20 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         """
         if not Verification.valid_nonce(block.header):
             return False, "Nonce is not valid"
-        if (
-            not Verification.hash_block_header(self.last_block.header)
-            == block.header.previous_hash
-        ):
+        if not self.last_block.hash() == block.header.previous_hash:
             return (
                 False,
                 "Hash of last block does not equal previous hash in the current block",
             )
         self.add_block_to_chain(block)
 
-        # Always work off a copy as to not disrupt the current list of open transactions
-        stored_transactions = self.__open_transactions[:]
-        for itx in block.transactions:
-            for opentx in stored_transactions:
-                if opentx.transaction_hash == itx:
-                    try:
-                        self.__open_transactions.remove(opentx)
-                    except ValueError:
-                        logger.warning("Item was already removed: %s", opentx)
+        # Drop the open transactions that made it into the block
+        mined_transactions = set(block.transactions)
+        self.__open_transactions = [
+            t
+            for t in self.__open_transactions
+            if t.transaction_hash not in mined_transactions
+        ]
 
         self.save_data()
         return True, "success"
@@ -515,9 +518,59 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
         if not parsed_url.scheme:
             raise ValueError("Must provide scheme (http/https) in node uri")
         full_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-        self.nodes.add(full_url)
+        with self.__nodes_lock:
+            self.nodes = self.nodes | {full_url}
         logger.debug("Registered node: %s", full_url)
 
+    def __fetch_length(self, node: str) -> Optional[int]:
+        """
+        Ask a neighbour for the length of its chain. Nodes that don't serve /chain/head
+        yet are asked for their full /chain instead.
+        """
+        for path in ["chain/head", "chain"]:
+            try:
+                response = self.__session.get(f"{node}/{path}", timeout=NODE_TIMEOUT)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                logger.warning("Unable to reach %s", node)
+                return None
+            if response.ok:
+                return response.json()["length"]
+        return None
+
+    def __fetch_chain(
+        self, node: str, block_hashes: List[str]
+    ) -> Tuple[List[Block], int]:
+        """
+        Build a neighbour's chain from its block hashes. The blocks it shares with this
+        node's chain are taken from this node, only the others are fetched.
+
+        :return: <Tuple[List[Block], int]> The chain and the number of shared blocks
+        """
+        shared = 0
+        for own_hash, block_hash in zip(self.pretty_chain(), block_hashes):
+            if own_hash != block_hash:
+                break
+            shared += 1
+
+        chain = self.__chain[:shared]
+        for b in block_hashes[shared:]:
+            response = requests.get(f"{node}/block/{b}")
+            if response.ok:
+                chain.append(Block.parse_raw(response.json()))
+        return chain, shared
+
+    def __fetch_transactions(self, node: str, chain: List[Block]) -> None:
+        """
+        Fetch and save the transactions of every block in the chain from a neighbour
+        """
+        for b in chain:
+            for tx_hash in b.transactions:
+                response = requests.get(f"{node}/transaction/{tx_hash}")
+                if response.ok:
+                    data = response.json()
+                    t = FinalTransaction.parse_raw(data["transaction"])
+                    self.save_transaction(t, data["type"])
+
     def resolve_conflicts(self) -> bool:
         """
         This is our Consensus Algorithm. It resolves conflicts by replacing our chain with
@@ -528,63 +581,60 @@ class Blockchain:  # pylint: disable=too-many-instance-attributes
 
         logger.debug("Resolving conflicts between the nodes if applicable")
 
-        neighbours = self.nodes
         new_chain = None
 
         # We're only looking for chains longer than ours
-        current_chain_length = len(self.chain)
+        current_chain_length = self.chain_length
+
+        # Ask every node in our network for the length of its chain, and only fetch the
+        # longest ones first: the first of those that verifies is the one we keep
+        nodes = list(self.nodes)
+        lengths = _node_executor.map(self.__fetch_length, nodes)
+        neighbours = sorted(
+            (
+                (length, node)
+                for node, length in zip(nodes, lengths)
+                if length is not None
+            ),
+            key=lambda n: n[0],
+            reverse=True,
+        )
+
+        for length, node in neighbours:
+            # Two chains holding only the genesis block: prefer the neighbour's
+            both_genesis = length == 1 and current_chain_length == 1
+
+            if length <= current_chain_length and not both_genesis:
+                logger.warning("Neighbour's chain shorter than our node")
+                continue
 
-        # Grab and verify the chains from all the nodes in our network
-        for node in neighbours:
             response = requests.get(f"{node}/chain")
+            if not response.ok:
+                continue
 
-            if response.ok:
-                length = response.json()["length"]
-                chain_hashes = response.json()["chain"]
-
-                chain = []
-
-                for b in chain_hashes:
-                    response = requests.get(f"{node}/block/{b}")
-                    if response.ok:
-                        parsed_block = Block.parse_raw(response.json())
-                        chain.append(parsed_block)
-
-                if (
-                    length == 1
-                    and current_chain_length == 1
-                    and Verification.verify_chain(chain)
-                ):
+            data = response.json()
+            length = data["length"]
+            chain, shared = self.__fetch_chain(node, data["chain"])
+
+            if both_genesis:
+                if Verification.verify_chain(chain):
                     logger.debug("Chain's are both 1 length so preferring neighbour's")
-                    current_chain_length = length
                     new_chain = chain
+                continue
 
-                # Ensure that the chain is sorted by index
-                chain.sort(key=lambda x: x.index, reverse=False)
+            # Ensure that the chain is sorted by index
+            chain.sort(key=lambda x: x.index, reverse=False)
+
+            logger.debug("Neighbour's chain is longer than ours")
+            logger.debug("Verifying neighbour's chain from block %s", shared)
+            if not Verification.verify_chain(chain, verified_length=shared):
+                logger.warning("Neighbour's chain failed verification")
+                continue
 
-                if length <= current_chain_length:
-                    logger.warning("Neighbour's chain shorter than our node")
-                    continue
-
-                logger.debug("Neighbour's chain is longer than ours")
-                logger.debug("Verifying neighbour's chain")
-                if not Verification.verify_chain(chain):
-                    logger.warning("Neighbour's chain failed verification")
-                    continue
-
-                logger.debug("Neighbour's chain successfully verified")
-                current_chain_length = length
-                new_chain = chain
-                for b in chain:
-                    for tx_hash in b.transactions:
-                        response = requests.get(f"{node}/transaction/{tx_hash}")
-                        if response.ok:
-                            t = FinalTransaction.parse_raw(
-                                response.json()["transaction"]
-                            )
-                            FinalTransaction.SaveTransaction(
-                                self.data_location, t, response.json()["type"]
-                            )
+            logger.debug("Neighbour's chain successfully verified")
+            current_chain_length = length
+            new_chain = chain
+            self.__fetch_transactions(node, chain[shared:])
 
         # Replace our chain if we discovered a new, valid chain longer than ours
         if new_chain:
@@ -152,7 +152,33 @@ def create_app(
         chain : List[Block]
         length : int
         """
-        response = {"chain": blockchain.pretty_chain(), "length": len(blockchain.chain)}
+        response = {
+            "chain": blockchain.pretty_chain(),
+            "length": blockchain.chain_length,
+        }
+        return jsonify(response), 200
+
+    @app.route("/chain/head", methods=["GET"])
+    def chain_head():  # pylint: disable=unused-variable
+        """
+        Returns the length of the chain and the hash of its last block, so nodes can
+        compare chains without fetching them
+
+        Methods
+        -----
+        GET
+
+        Returns application/json
+        -----
+        Return code : 200
+        Response :
+        length : int
+        tip_hash : str
+        """
+        response = {
+            "length": blockchain.chain_length,
+            "tip_hash": blockchain.last_block.block_hash,
+        }
         return jsonify(response), 200
 
     @app.route("/block/<block_hash>", methods=["GET"])
@@ -347,9 +373,7 @@ def create_app(
                     transaction_id=Verification.hash_transaction(t),
                     signed_transaction=t,
                 )
-                FinalTransaction.SaveTransaction(
-                    blockchain.data_location, tx, values["type"]
-                )
+                blockchain.save_transaction(tx, values["type"])
                 response = {
                     "message": f"Successfully saved {values['type']} transaction.",
                     "transaction": values["transaction"],
@@ -0,0 +1,207 @@
+"""
+Nonce search for Verification.proof_of_work compiled with numba. It is used when the
+pow_ext extension isn't built but numba is installed.
+
+hashlib can't be called from numba code, so SHA256 is implemented here. The guess hashed
+for every nonce is the same one built by Verification.valid_nonce:
+  transaction_merkle_root + previous_hash + str(nonce) + str(version)
+"""
+from typing import Optional
+
+import numpy as np  # pylint: disable=import-error
+
+from numba import njit, prange  # pylint: disable=import-error
+
+MASK = 0xFFFFFFFF
+
+# fmt: off
+# SHA256 round constants
+K = np.array(
+    [
+        0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5,
+        0x3956C25B, 0x59F111F1, 0x923F82A4, 0xAB1C5ED5,
+        0xD807AA98, 0x12835B01, 0x243185BE, 0x550C7DC3,
+        0x72BE5D74, 0x80DEB1FE, 0x9BDC06A7, 0xC19BF174,
+        0xE49B69C1, 0xEFBE4786, 0x0FC19DC6, 0x240CA1CC,
+        0x2DE92C6F, 0x4A7484AA, 0x5CB0A9DC, 0x76F988DA,
+        0x983E5152, 0xA831C66D, 0xB00327C8, 0xBF597FC7,
+        0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967,
+        0x27B70A85, 0x2E1B2138, 0x4D2C6DFC, 0x53380D13,
+        0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85,
+        0xA2BFE8A1, 0xA81A664B, 0xC24B8B70, 0xC76C51A3,
+        0xD192E819, 0xD6990624, 0xF40E3585, 0x106AA070,
+        0x19A4C116, 0x1E376C08, 0x2748774C, 0x34B0BCB5,
+        0x391C0CB3, 0x4ED8AA4A, 0x5B9CCA4F, 0x682E6FF3,
+        0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208,
+        0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7, 0xC67178F2,
+    ],
+    dtype=np.int64,
+)
+
+# SHA256 initial hash values
+H = np.array(
+    [
+        0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+        0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19,
+    ],
+    dtype=np.int64,
+)
+# fmt: on
+
+
+@njit(cache=True)
+def _rotr(x: int, n: int) -> int:
+    return ((x >> n) | (x << (32 - n))) & MASK
+
+
+@njit(cache=True)
+def _compress(state: np.ndarray, block: np.ndarray, offset: int) -> None:
+    """
+    Run the SHA256 compression function over the 64 bytes of <block> at <offset>,
+    updating <state> in place
+    """
+    w = np.empty(64, np.int64)
+    for t in range(16):
+        i = offset + 4 * t
+        w[t] = (
+            (np.int64(block[i]) << 24)
+            | (np.int64(block[i + 1]) << 16)
+            | (np.int64(block[i + 2]) << 8)
+            | np.int64(block[i + 3])
+        )
+    for t in range(16, 64):
+        s0 = _rotr(w[t - 15], 7) ^ _rotr(w[t - 15], 18) ^ (w[t - 15] >> 3)
+        s1 = _rotr(w[t - 2], 17) ^ _rotr(w[t - 2], 19) ^ (w[t - 2] >> 10)
+        w[t] = (w[t - 16] + s0 + w[t - 7] + s1) & MASK
+
+    a, b, c, d, e, f, g, h = (
+        state[0],
+        state[1],
+        state[2],
+        state[3],
+        state[4],
+        state[5],
+        state[6],
+        state[7],
+    )
+    for t in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ ((~e & MASK) & g)
+        temp1 = (h + s1 + ch + K[t] + w[t]) & MASK
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        temp2 = (s0 + maj) & MASK
+        h = g
+        g = f
+        f = e
+        e = (d + temp1) & MASK
+        d = c
+        c = b
+        b = a
+        a = (temp1 + temp2) & MASK
+
+    state[0] = (state[0] + a) & MASK
+    state[1] = (state[1] + b) & MASK
+    state[2] = (state[2] + c) & MASK
+    state[3] = (state[3] + d) & MASK
+    state[4] = (state[4] + e) & MASK
+    state[5] = (state[5] + f) & MASK
+    state[6] = (state[6] + g) & MASK
+    state[7] = (state[7] + h) & MASK
+
+
+@njit(cache=True)
+def _write_decimal(buffer: np.ndarray, offset: int, value: int) -> int:
+    """
+    Write <value> in decimal at <offset> and return the offset right after it
+    """
+    digits = 1
+    rest = value // 10
+    while rest > 0:
+        digits += 1
+        rest //= 10
+    for i in range(digits - 1, -1, -1):
+        buffer[offset + i] = 48 + value % 10
+        value //= 10
+    return offset + digits
+
+
+@njit(cache=True)
+def _meets_difficulty(state: np.ndarray, difficulty: int) -> bool:
+    """
+    Does the digest start with <difficulty> zeros in its hex form?
+    """
+    if difficulty > 64:
+        return False
+    for i in range(difficulty // 8):
+        if state[i] != 0:
+            return False
+    nibbles = difficulty % 8
+    return nibbles == 0 or state[difficulty // 8] >> (32 - 4 * nibbles) == 0
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _search(  # pylint: disable=too-many-arguments
+    midstate: np.ndarray,
+    tail: np.ndarray,
+    hashed_length: int,
+    version: int,
+    difficulty: int,
+    start: int,
+    stride: int,
+    count: int,
+) -> int:
+    """
+    Return the index of the first of the <count> nonces that meets the difficulty,
+    or <count> if none does
+    """
+    found = count
+    for i in prange(count):  # pylint: disable=not-an-iterable
+        buffer = np.zeros(128, np.uint8)
+        length = tail.shape[0]
+        buffer[:length] = tail
+        length = _write_decimal(buffer, length, start + i * stride)
+        length = _write_decimal(buffer, length, version)
+
+        # SHA256 padding: a 1 bit, zeros, and the message length in bits
+        buffer[length] = 0x80
+        blocks = 1 if length + 9 <= 64 else 2
+        bit_length = (hashed_length + length) * 8
+        for j in range(8):
+            buffer[blocks * 64 - 1 - j] = (bit_length >> (8 * j)) & 0xFF
+
+        state = midstate.copy()
+        for j in range(blocks):
+            _compress(state, buffer, j * 64)
+
+        if _meets_difficulty(state, difficulty):
+            found = min(found, i)
+    return found
+
+
+def find_nonce(  # pylint: disable=too-many-arguments
+    prefix: bytes, version: int, difficulty: int, start: int, stride: int, count: int
+) -> Optional[int]:
+    """
+    Try <count> nonces starting at <start>, <stride> apart, over every CPU core.
+    Returns the first nonce meeting the difficulty, or None.
+    """
+    data = np.frombuffer(prefix, dtype=np.uint8)
+    hashed_length = len(prefix) - len(prefix) % 64
+
+    # The full 64 byte blocks of the prefix are the same for every nonce
+    midstate = H.copy()
+    for offset in range(0, hashed_length, 64):
+        _compress(midstate, data, offset)
+
+    index = _search(
+        midstate,
+        data[hashed_length:].copy(),
+        hashed_length,
+        version,
+        difficulty,
+        start,
+        stride,
+        count,
+    )
+    return start + index * stride if index < count else None
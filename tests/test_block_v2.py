@@ -3,6 +3,7 @@ from datetime import datetime
 from block import Block
 from block import Header
 from transaction import Details, FinalTransaction, SignedRawTransaction, get_merkle_root
+from verification import Verification
 
 
 def test_block_format():
@@ -135,3 +136,68 @@ def test_block_to_protobuf_and_back_with_transactions():
         transaction_count=len(transactions),
         transactions=[t.transaction_hash for t in transactions],
     )
+
+
+def test_block_hash_is_cached_until_header_changes():
+    timestamp = datetime.utcfromtimestamp(0)
+
+    header = Header(
+        version=1,
+        previous_hash="",
+        timestamp=timestamp,
+        transaction_merkle_root="",
+        difficulty=4,
+        nonce=100,
+    )
+
+    block = Block(
+        index=0,
+        block_hash="",
+        size=0,
+        header=header,
+        transaction_count=0,
+        transactions=[],
+    )
+
+    assert block.hash() == Verification.hash_block_header(header)
+    assert block.hash() is block.hash()
+
+    block.header = Header(
+        version=1,
+        previous_hash="",
+        timestamp=timestamp,
+        transaction_merkle_root="",
+        difficulty=4,
+        nonce=101,
+    )
+
+    assert block.hash() == Verification.hash_block_header(block.header)
+    assert block.hash() != Verification.hash_block_header(header)
+
+
+def test_block_hex_is_cached_until_block_changes():
+    timestamp = datetime.utcfromtimestamp(0)
+
+    block = Block(
+        index=0,
+        block_hash="",
+        size=0,
+        header=Header(
+            version=1,
+            previous_hash="",
+            timestamp=timestamp,
+            transaction_merkle_root="",
+            difficulty=4,
+            nonce=100,
+        ),
+        transaction_count=0,
+        transactions=[],
+    )
+
+    p_block = block.SerializeToHex()
+    assert block.SerializeToHex() is p_block
+
+    block.index = 1
+
+    assert block.SerializeToHex() != p_block
+    assert block.SerializeToHex() == block.SerializeToString().hex()
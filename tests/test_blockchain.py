@@ -1,7 +1,11 @@
+import json
+import threading
+
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from uuid import uuid4
 
-from blockchain import Blockchain
+from blockchain import MINING_REWARD, Blockchain
 from transaction import Details
 from verification import Verification
 from wallet import Wallet
@@ -134,3 +138,172 @@ def test_not_enough_coin():
         assert "This was expected to throw a ValueError exception but didn't"
     except ValueError:
         pass
+
+
+def test_balance():
+    timestamp = datetime.utcfromtimestamp(0)
+    node_id = uuid4()
+    w1 = Wallet(test=True)
+    w2 = Wallet(test=True)
+
+    chain = Blockchain(w1.address, node_id, difficulty=1, is_test=True)
+    assert chain.get_balance() == 0.0
+
+    chain.mine_block()
+    assert chain.get_balance() == MINING_REWARD
+
+    details = Details(
+        sender=w1.address,
+        recipient=w2.address,
+        nonce=0,
+        amount=0.5,
+        timestamp=timestamp,
+        public_key=w1.public_key.hex(),
+    )
+    chain.add_transaction(w1.sign_transaction(details), is_receiving=True)
+    assert chain.get_balance() == MINING_REWARD - 0.5
+    assert chain.get_balance(w2.address) == 0.5
+
+    chain.mine_block()
+    assert chain.get_balance() == 2 * MINING_REWARD - 0.5
+    assert chain.get_balance(w2.address) == 0.5
+
+    # Rebuilding the balances from storage gives the same result
+    chain.load_data()
+    assert chain.get_balance() == 2 * MINING_REWARD - 0.5
+    assert chain.get_balance(w2.address) == 0.5
+
+
+class FakeNode:
+    """
+    A node listening on localhost that records every request and answers GET requests
+    with the JSON registered for their path
+    """
+
+    def __init__(self, responses=None):
+        self.received = []
+        responses = responses or {}
+        received = self.received
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                received.append((self.path, None))
+                self.reply(200, responses.get(self.path))
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append((self.path, json.loads(self.rfile.read(length))))
+                self.reply(201, {})
+
+            def reply(self, status, body):
+                self.send_response(status if body is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps(body).encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+
+    @property
+    def paths(self):
+        return [path for path, _ in self.received]
+
+
+def test_broadcast_skips_unreachable_nodes():
+    w = Wallet(test=True)
+    chain = Blockchain(w.address, uuid4(), difficulty=1, is_test=True)
+
+    with FakeNode() as node:
+        chain.register_node(node.url)
+        # Nothing listens on port 1
+        chain.register_node("http://127.0.0.1:1")
+
+        block = chain.mine_block()
+
+    assert node.paths == ["/broadcast-transaction", "/broadcast-block"]
+    assert node.received[1][1] == {"block": block.SerializeToHex()}
+
+
+def test_resolve_conflicts_ignores_shorter_chain():
+    w = Wallet(test=True)
+    chain = Blockchain(w.address, uuid4(), difficulty=1, is_test=True)
+    chain.mine_block()
+
+    with FakeNode({"/chain": {"length": 1, "chain": ["genesis"]}}) as node:
+        chain.register_node(node.url)
+
+        assert not chain.resolve_conflicts()
+
+    # The blocks of a shorter chain are never fetched
+    assert node.paths == ["/chain/head", "/chain"]
+    assert chain.chain_length == 2
+
+
+def test_resolve_conflicts_only_fetches_new_blocks():
+    timestamp = datetime.utcfromtimestamp(0)
+    w = Wallet(test=True)
+    neighbour = Blockchain(
+        w.address, uuid4(), difficulty=1, is_test=True, timestamp=timestamp
+    )
+    chain = Blockchain(
+        w.address, uuid4(), difficulty=1, is_test=True, timestamp=timestamp
+    )
+    genesis = chain.last_block
+
+    block = neighbour.mine_block()
+    responses = {
+        "/chain/head": {"length": 2, "tip_hash": block.block_hash},
+        "/chain": {"length": 2, "chain": neighbour.pretty_chain()},
+        f"/block/{block.block_hash}": block.json(),
+    }
+
+    with FakeNode(responses) as node:
+        chain.register_node(node.url)
+
+        assert chain.resolve_conflicts()
+
+    # The genesis block is shared, so only the mined block is fetched
+    assert [p for p in node.paths if p.startswith("/block/")] == [
+        f"/block/{block.block_hash}"
+    ]
+    assert chain.chain == neighbour.chain
+    assert chain.chain[0] is genesis
+
+
+def test_add_block_removes_mined_open_transactions():
+    timestamp = datetime.utcfromtimestamp(0)
+    w1 = Wallet(test=True)
+    w2 = Wallet(test=True)
+
+    chain1 = Blockchain(w1.address, uuid4(), difficulty=1, is_test=True)
+    chain2 = Blockchain(w2.address, uuid4(), difficulty=1, is_test=True)
+    chain2.chain = chain1.chain
+
+    details = Details(
+        sender=w1.address,
+        recipient=w2.address,
+        nonce=0,
+        amount=0.5,
+        timestamp=timestamp,
+        public_key=w1.public_key.hex(),
+    )
+    transaction = w1.sign_transaction(details)
+
+    chain1.add_transaction(transaction, is_receiving=True)
+    chain2.add_transaction(transaction, is_receiving=True)
+    assert len(chain2.get_open_transactions) == 1
+
+    result, _ = chain2.add_block(chain1.mine_block())
+
+    assert result
+    assert chain2.get_open_transactions == []
@@ -41,6 +41,14 @@ class TestNodeChain(TestBase):
         rv = client.get("/chain")
         self.assertStatus(rv, 200)
 
+    def test_chain_head_response(self, _, client):
+        rv = client.get("/chain")
+        tip_hash = rv.json["chain"][-1]
+
+        rv = client.get("/chain/head")
+        self.assertStatus(rv, 200)
+        self.assertJsonEqual(rv, {"length": 1, "tip_hash": tip_hash})
+
 
 class TestNodeNodes(TestBase):
     def test_nodes_response(self, _, client):
@@ -1,5 +1,10 @@
+import hashlib
+
 from datetime import datetime
 
+import pytest
+
+import verification
 from block import Block, Header
 from transaction import Details, SignedRawTransaction, get_merkle_root
 from verification import Verification
@@ -169,3 +174,70 @@ def test_correct_nonce():
     )
 
     assert Verification.valid_nonce(block_two.header)
+
+
+def test_meets_difficulty_matches_hex_leading_zeros():
+    for i in range(256):
+        digest = hashlib.sha256(str(i).encode()).digest()
+        hex_digest = digest.hex()
+        for difficulty in range(0, 4):
+            assert Verification.meets_difficulty(digest, difficulty) == (
+                hex_digest[:difficulty] == "0" * difficulty
+            )
+
+    assert Verification.meets_difficulty(bytes(32), 64)
+    assert not Verification.meets_difficulty(bytes(32), 65)
+
+
+def test_find_nonce_stride():
+    header = Header(
+        timestamp=datetime.utcfromtimestamp(0),
+        transaction_merkle_root="",
+        nonce=0,
+        previous_hash="",
+        difficulty=2,
+        version=1,
+    )
+    prefix = Verification.nonce_prefix(header)
+
+    nonce = Verification.find_nonce(prefix, 1, 2, 3, 5, 100000)
+    assert nonce is not None
+    assert nonce % 5 == 3
+    header.nonce = nonce
+    assert Verification.valid_nonce(header)
+
+    assert Verification.find_nonce(prefix, 1, 2, 3, 5, 0) is None
+
+
+def test_find_nonce_compiled_matches_python(monkeypatch):
+    if verification.pow_ext is None:
+        pytest.skip("pow_ext is not built")
+
+    prefix = b"merkle_root" + b"previous_hash"
+    compiled = Verification.find_nonce(prefix, 1, 3, 0, 1, 100000)
+    monkeypatch.setattr(verification, "pow_ext", None)
+    assert Verification.find_nonce(prefix, 1, 3, 0, 1, 100000) == compiled
+
+
+def test_parallel_proof_of_work():
+    header = Header(
+        version=1,
+        difficulty=3,
+        timestamp=datetime.utcfromtimestamp(1),
+        transaction_merkle_root="",
+        previous_hash="",
+        nonce=0,
+    )
+
+    header = Verification.proof_of_work(header, workers=2)
+
+    assert Verification.valid_nonce(header)
+
+
+def test_nonce_suffix_matches_string_format():
+    for nonce in [0, 7, 4096, 2 ** 40]:
+        for version in [1, 12]:
+            assert (
+                Verification.nonce_suffix(nonce, version)
+                == (str(nonce) + str(version)).encode()
+            )
@@ -1,15 +1,62 @@
 import logging
 import hashlib
+import multiprocessing
+import os
 
-from typing import Callable, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional
 
 from block import Block, Header
 
 from transaction import SignedRawTransaction
 from wallet import Wallet
 
+try:
+    # Optional compiled nonce search, built with `make build-pow-ext`
+    import pow_ext  # pylint: disable=import-error
+except ImportError:
+    pow_ext = None
+
+try:
+    # Optional nonce search compiled with numba, used when pow_ext isn't built
+    import pow_numba
+except ImportError:
+    pow_numba = None
+
 logger = logging.getLogger(__name__)
 
+# Number of nonces tried per call to Verification.find_nonce while mining
+NONCE_BATCH_SIZE = 4096
+
+# Difficulty from which proof_of_work spreads the nonce search over every CPU core
+PARALLEL_DIFFICULTY = 5
+
+# Set once any search worker found a valid nonce (see _init_search_worker)
+_stop_event = None  # type: Any
+
+
+def _init_search_worker(stop_event: Any) -> None:
+    global _stop_event  # pylint: disable=global-statement
+    _stop_event = stop_event
+
+
+def _search(
+    prefix: bytes, version: int, difficulty: int, start: int, stride: int
+) -> Optional[int]:
+    """
+    Search every <stride>th nonce from <start> until one is found here or in another
+    worker. Checks the stop event between every batch of nonces.
+    """
+    while not _stop_event.is_set():
+        nonce = Verification.find_nonce(
+            prefix, version, difficulty, start, stride, NONCE_BATCH_SIZE
+        )
+        if nonce is not None:
+            _stop_event.set()
+            return nonce
+        start += stride * NONCE_BATCH_SIZE
+    return None
+
 
 class Verification:
     @staticmethod
@@ -37,6 +84,44 @@ class Verification:
         hashable_transaction = transaction.SerializeToString()
         return Verification.hash_bytes_256(hashable_transaction)
 
+    @staticmethod
+    def nonce_prefix(header: Header) -> bytes:
+        """
+        The part of the nonce guess that stays the same while mining a block
+        :param header: <Header> Block header
+        :return: <bytes> Encoded transaction merkle root and previous hash
+        """
+        return (
+            str(header.transaction_merkle_root) + str(header.previous_hash)
+        ).encode()
+
+    @staticmethod
+    def nonce_suffix(nonce: int, version: int) -> bytes:
+        """
+        The part of the nonce guess that changes with every nonce tried while mining
+        :param nonce: <int> Nonce being tried
+        :param version: <int> Block version
+        :return: <bytes> Encoded nonce and version, in decimal
+        """
+        # Formatting straight into bytes skips the intermediate str objects
+        return b"%d%d" % (nonce, version)
+
+    @staticmethod
+    def meets_difficulty(digest: bytes, difficulty: int) -> bool:
+        """
+        Does the SHA256 digest contain <difficulty> leading zeros in its hex form?
+
+        Every hex character is 4 bits, so this compares the leading bits of the raw
+        digest instead of building the hex string.
+        :param digest: <bytes> Raw SHA256 digest
+        :param difficulty: <int> Number of leading hex zeros required
+        :return: <bool> True if the digest meets the difficulty, False if not
+        """
+        bits = len(digest) * 8
+        if difficulty * 4 > bits:
+            return False
+        return int.from_bytes(digest, "big") >> (bits - difficulty * 4) == 0
+
     @staticmethod
     def valid_nonce(header: Header) -> bool:
         """
@@ -44,17 +129,84 @@ class Verification:
         :param header: <Header> Block header
         :return: <bool> True if correct, False if not
         """
-        guess = (
-            str(header.transaction_merkle_root)
-            + str(header.previous_hash)
-            + str(header.nonce)
-            + str(header.version)
-        ).encode()
-        guess_hash = Verification.hash_bytes_256(guess)
-        return guess_hash[: header.difficulty] == "0" * header.difficulty
+        guess = Verification.nonce_prefix(header) + Verification.nonce_suffix(
+            header.nonce, header.version
+        )
+        return Verification.meets_difficulty(
+            hashlib.sha256(guess).digest(), header.difficulty
+        )
+
+    @staticmethod
+    def find_nonce(  # pylint: disable=too-many-arguments
+        prefix: bytes,
+        version: int,
+        difficulty: int,
+        start: int,
+        stride: int,
+        count: int,
+    ) -> Optional[int]:
+        """
+        Try <count> nonces, starting at <start> and <stride> apart, and return the first
+        one whose guess meets the difficulty.
+
+        Uses the compiled pow_ext module when it is available, then pow_numba when numba
+        is installed. Otherwise the prefix is hashed once and only the nonce and version
+        are fed into a copy of that hash per guess.
+        :param prefix: <bytes> The nonce prefix of the block header
+        :param version: <int> Block version
+        :param difficulty: <int> Number of leading hex zeros required
+        :param start: <int> First nonce to try
+        :param stride: <int> Distance between two tried nonces
+        :param count: <int> Number of nonces to try
+        :return: <Optional[int]> The valid nonce, or None if none of them were valid
+        """
+        if pow_ext is not None:
+            return pow_ext.find_nonce(prefix, version, difficulty, start, stride, count)
+        if pow_numba is not None:
+            return pow_numba.find_nonce(
+                prefix, version, difficulty, start, stride, count
+            )
+
+        prefix_hash = hashlib.sha256(prefix)
+        for nonce in range(start, start + stride * count, stride):
+            guess_hash = prefix_hash.copy()
+            guess_hash.update(Verification.nonce_suffix(nonce, version))
+            if Verification.meets_difficulty(guess_hash.digest(), difficulty):
+                return nonce
+        return None
 
     @staticmethod
-    def proof_of_work(header: Header) -> Header:
+    def parallel_find_nonce(
+        prefix: bytes, version: int, difficulty: int, start: int, workers: int
+    ) -> int:
+        """
+        Stripe the nonce search over <workers> processes: worker k tries the nonces
+        start + k, start + k + workers, start + k + 2 * workers, ...
+
+        The first worker to find a valid nonce tells the others to stop.
+        :return: <int> The valid nonce
+        """
+        stop_event = multiprocessing.Event()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_search_worker,
+            initargs=(stop_event,),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _search, prefix, version, difficulty, start + k, workers
+                )
+                for k in range(workers)
+            ]
+            for future in as_completed(futures):
+                nonce = future.result()
+                if nonce is not None:
+                    stop_event.set()
+                    return nonce
+        raise RuntimeError("Every nonce search worker stopped without a valid nonce")
+
+    @staticmethod
+    def proof_of_work(header: Header, workers: Optional[int] = None) -> Header:
         """
         Simple Proof of Work Algorithm
           - Find a number 'p' such that hash(pp') contains leading {difficulty} zeros,
@@ -71,37 +223,61 @@ class Verification:
             where the result of the hash contains the {difficulty} number of leading 0's.
             I.E. If the difficulty is 4, then a valid nonce will only be found when the SHA256
                  hash contains 4 leading 0's.
-        :param difficulty: <int>
-        :return: <int>
+
+        The nonces are searched in batches by Verification.find_nonce. From
+        PARALLEL_DIFFICULTY onwards the search is spread over every CPU core.
+        :param header: <Header> Block header, mining starts at its nonce
+        :param workers: <Optional[int]> Number of processes to search with
+        :return: <Header> The block header with a valid nonce
         """
         logger.info(
             "Mining block for %s version and %s difficulty",
             header.version,
             header.difficulty,
         )
-        while not Verification.valid_nonce(header):
-            header.nonce += 1
+        if workers is None:
+            workers = 1
+            # pow_numba already spreads every batch over all CPU cores on its own
+            uses_numba = pow_ext is None and pow_numba is not None
+            if header.difficulty >= PARALLEL_DIFFICULTY and not uses_numba:
+                workers = os.cpu_count() or 1
 
-        return header
+        prefix = Verification.nonce_prefix(header)
+        start = header.nonce
+        if workers > 1:
+            header.nonce = Verification.parallel_find_nonce(
+                prefix, header.version, header.difficulty, start, workers
+            )
+            return header
+
+        while True:
+            nonce = Verification.find_nonce(
+                prefix, header.version, header.difficulty, start, 1, NONCE_BATCH_SIZE
+            )
+            if nonce is not None:
+                header.nonce = nonce
+                return header
+            start += NONCE_BATCH_SIZE
 
     @classmethod
-    def verify_chain(cls, blockchain: List[Block]) -> bool:
+    def verify_chain(cls, blockchain: List[Block], verified_length: int = 0) -> bool:
         """
         Determine if a given blockchain is valid
         :param chain: List[Block] A Blockchain
+        :param verified_length: <int> Number of leading blocks that were already verified,
+                                e.g. because they are shared with this node's chain
         :return: <bool> True if valid, False if not
         """
 
-        for (index, block) in enumerate(blockchain):
-            if index == 0:
-                continue
+        for index in range(max(verified_length, 1), len(blockchain)):
+            block = blockchain[index]
             logger.debug(
                 "Checking index %s previous hash with the block hash of index %s",
                 index,
                 index - 1,
             )
 
-            computed_previous_hash = cls.hash_block_header(blockchain[index - 1].header)
+            computed_previous_hash = blockchain[index - 1].hash()
             if block.header.previous_hash != computed_previous_hash:
                 logger.error(
                     "Previous block hashed not equal to previous hash stored in current block"
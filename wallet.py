@@ -273,17 +273,17 @@ class Wallet:
         last_nonce = None
 
         if sender_last_nonce is not None and sender_open_nonce is None:
-            print("Sender has no sent transactions on the chain")
+            logger.debug("Sender has no sent transactions on the chain")
             last_nonce = sender_last_nonce
         elif sender_open_nonce is not None and sender_last_nonce is None:
-            print("Sender only has open sent transactions")
+            logger.debug("Sender only has open sent transactions")
             last_nonce = sender_open_nonce
         elif (
             sender_last_nonce is not None
             and sender_open_nonce is not None
             and sender_open_nonce == sender_last_nonce + 1
         ):
-            print(
+            logger.debug(
                 "Sender only has open sent transactions with nonce %s",
                 sender_open_nonce,
             )